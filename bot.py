@@ -1,10 +1,46 @@
 import os
 import asyncio
+import atexit
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import signal
+import time
 
 import discord
 from discord.ext import commands, tasks
 from mcstatus import JavaServer
-from mcrcon import MCRcon
+import aiomcrcon
+
+try:
+    import uvloop  # Linux-only; ~2x faster event loop
+except ImportError:
+    uvloop = None
+
+# ---- Logging ----
+# Records go through a queue: coroutines only enqueue, and the actual
+# stdout I/O happens on the listener's background thread, so a slow
+# terminal/pipe never stalls the event loop.
+
+_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(
+    logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s")
+)
+_log_listener = logging.handlers.QueueListener(_log_queue, _log_stream)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger = logging.getLogger("cartofia")
+logger.setLevel(logging.INFO)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+# Don't also bubble up to the root handlers (discord.py installs one):
+# that would print every record twice, synchronously on the loop thread.
+logger.propagate = False
+
 
 # ---- Environment config ----
 
@@ -32,11 +68,55 @@ CARTOFIA_IP = "answers-advertising.gl.joinmc.link"
 
 intents = discord.Intents.default()
 intents.message_content = True  # needed for prefix commands
-bot = commands.Bot(command_prefix=COMMAND_PREFIX, intents=intents)
+# max_ratelimit_timeout makes discord.py raise RateLimited (which carries
+# retry_after) instead of silently sleeping inside the HTTP call for up
+# to ~600s on a long 429 — that sleep would stall the presence loop, and
+# the exception is what feeds _with_retry's per-bucket gate.
+bot = commands.Bot(
+    command_prefix=COMMAND_PREFIX,
+    intents=intents,
+    max_ratelimit_timeout=30.0,
+)
 
 # Tracks last known "server online/offline" state for announcements
 last_server_online: bool | None = None
 
+# Resolved once instead of walking the channel cache every tick
+status_channel: discord.TextChannel | None = None
+
+
+def _get_status_channel() -> discord.TextChannel | None:
+    """Return the status channel, resolving and caching it on first use.
+
+    The lazy retry also covers the case where the channel cache is still
+    warming up when the first presence tick fires.
+    """
+    global status_channel
+    if status_channel is None and STATUS_CHANNEL_ID is not None:
+        channel = bot.get_channel(STATUS_CHANNEL_ID)
+        if isinstance(channel, discord.TextChannel):
+            status_channel = channel
+    return status_channel
+
+# Discord only allows ~2 channel-topic edits per 10 minutes, so edits
+# are debounced to at most one per interval; intermediate changes are
+# simply dropped, since every tick recomputes the desired topic anyway.
+TOPIC_EDIT_MIN_INTERVAL = 600.0  # seconds
+
+_last_topic_edit_ts = 0.0
+
+# Last (server_online, player count) we pushed to the gateway; presence
+# updates are rate-limited (5/60s per session), so identical states are
+# not re-sent.
+_last_presence: tuple[bool, int] | None = None
+
+# The offline presence text never changes, so build the Activity once
+# instead of once per tick.
+_OFFLINE_ACTIVITY = discord.Activity(
+    type=discord.ActivityType.watching,
+    name=f"{SERVER_NAME} server offline",
+)
+
 
 # ---- Minecraft status helpers ----
 
@@ -71,38 +151,147 @@ async def send_cartofia_ad(channel: discord.TextChannel):
     await channel.send(embed=embed)
 
 
-def _get_status_blocking():
-    """Blocking call to ping the Minecraft server (runs in thread)."""
-    server = JavaServer.lookup(f"{MC_HOST}:{MC_PORT}")
-    return server.status()
+# The DNS/SRV lookup result is cached: the host is static, so
+# re-resolving on every poll is wasted work. The hourly expiry still
+# picks up SRV record changes eventually.
+SERVER_LOOKUP_TTL = 3600.0  # seconds
+
+_server_cache = {"value": None, "expires": 0.0}
+
+
+async def _get_server() -> JavaServer:
+    """Return the resolved JavaServer, re-running lookup once per hour."""
+    now = time.monotonic()
+    if _server_cache["value"] is None or now >= _server_cache["expires"]:
+        _server_cache["value"] = await JavaServer.async_lookup(f"{MC_HOST}:{MC_PORT}")
+        _server_cache["expires"] = now + SERVER_LOOKUP_TTL
+    return _server_cache["value"]
+
+
+async def _fetch_status():
+    """Ping the Minecraft server over mcstatus's native async API."""
+    server = await _get_server()
+    return await server.async_status()
+
+
+# Short TTL cache for status pings: the presence loop and a burst of
+# !online invocations share one network round-trip instead of each
+# opening a TCP connection to the MC server.
+STATUS_CACHE_TTL = 10.0  # seconds a result is considered fresh
+STATUS_CACHE_STALE_TTL = 30.0  # max age we still serve when a ping fails
+
+_status_cache = {"value": None, "fetched": 0.0, "expires": 0.0}
+
+# Single-flight: concurrent cache misses all await the same refresh task
+# instead of each opening their own connection. The lock only guards
+# task creation, not the network round-trip itself.
+_inflight: asyncio.Task | None = None
+_inflight_lock = asyncio.Lock()
+
+
+async def _refresh_status():
+    """Do one real ping and update the cache with the result."""
+    try:
+        status = await _fetch_status()
+    except Exception:
+        # Ping failed: serve the last known status if it is not too
+        # stale, so one dropped packet doesn't flip us to "offline".
+        age = time.monotonic() - _status_cache["fetched"]
+        if _status_cache["value"] is not None and age < STATUS_CACHE_STALE_TTL:
+            return _status_cache["value"]
+        raise
+
+    _status_cache["value"] = status
+    _status_cache["fetched"] = time.monotonic()
+    _status_cache["expires"] = _status_cache["fetched"] + STATUS_CACHE_TTL
+    return status
 
 
 async def get_status_async():
-    """Run the blocking status call in a thread so we don't freeze the bot."""
-    loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(None, _get_status_blocking)
+    """Ping the server, reusing a recent result when one is available.
+
+    On a cache miss, concurrent callers share a single in-flight refresh
+    instead of each hitting the server themselves.
+    """
+    global _inflight
+
+    if _status_cache["value"] is not None and time.monotonic() < _status_cache["expires"]:
+        return _status_cache["value"]
 
+    async with _inflight_lock:
+        if _inflight is None or _inflight.done():
+            _inflight = asyncio.create_task(_refresh_status())
+        task = _inflight
+    return await task
 
-def _rcon_list_blocking() -> str:
-    """Blocking RCON /list call."""
-    with MCRcon(RCON_HOST, RCON_PASSWORD, port=RCON_PORT) as mcr:
-        # RCON commands do NOT take the leading slash
-        resp = mcr.command("list")
-        return resp
+
+# Persistent RCON session: connecting + authenticating costs a full
+# round-trip, so we keep one client alive and only reconnect on error.
+_rcon_client: aiomcrcon.Client | None = None
+_rcon_lock = asyncio.Lock()
+
+
+async def _rcon_connect() -> aiomcrcon.Client:
+    client = aiomcrcon.Client(RCON_HOST, RCON_PORT, RCON_PASSWORD)
+    await client.connect()
+    return client
+
+
+async def _rcon_close():
+    """Close the persistent RCON session, if any."""
+    global _rcon_client
+    if _rcon_client is not None:
+        try:
+            await _rcon_client.close()
+        except Exception:
+            pass
+        _rcon_client = None
 
 
 async def rcon_list_async() -> str | None:
-    """Async wrapper around the blocking RCON /list call."""
+    """Run /list over the persistent RCON session, reconnecting on error."""
+    global _rcon_client
     if not RCON_ENABLED:
         return None
 
-    loop = asyncio.get_running_loop()
-    try:
-        resp = await loop.run_in_executor(None, _rcon_list_blocking)
-        return resp
-    except Exception as e:
-        print(f"RCON list failed: {e}")
-        return None
+    async with _rcon_lock:
+        try:
+            if _rcon_client is None:
+                _rcon_client = await _rcon_connect()
+            # RCON commands do NOT take the leading slash
+            resp, _ = await _rcon_client.send_cmd("list")
+            return resp
+        except Exception:
+            # The session may simply have gone stale (server restart,
+            # idle timeout): drop it and retry once on a fresh one.
+            await _rcon_close()
+            try:
+                _rcon_client = await _rcon_connect()
+                resp, _ = await _rcon_client.send_cmd("list")
+                return resp
+            except Exception:
+                logger.warning("RCON list failed", exc_info=True)
+                await _rcon_close()
+                return None
+
+
+# Everything after the first colon, then each comma-separated name with
+# surrounding whitespace trimmed (single scan, no intermediate lists).
+_LIST_RE = re.compile(r":\s*(.*)$")
+_NAME_RE = re.compile(r"[^,\s][^,]*[^,\s]|[^,\s]")
+
+
+def _rcon_needed(status) -> bool:
+    """RCON only adds information when the status sample is incomplete.
+
+    Small servers usually return the full roster in the ping sample, in
+    which case a /list round-trip would tell us nothing new.
+    """
+    online = status.players.online
+    if online == 0 or not RCON_ENABLED:
+        return False
+    sample = status.players.sample or []
+    return len(sample) < online
 
 
 def parse_rcon_list(resp: str) -> list[str]:
@@ -112,26 +301,97 @@ def parse_rcon_list(resp: str) -> list[str]:
     'There are 2 of a max of 20 players online: Steve, Alex'
     'There are 0 of a max of 20 players online.'
     """
-    if ":" not in resp:
-        return []
+    m = _LIST_RE.search(resp)
+    return _NAME_RE.findall(m.group(1)) if m else []
+
+
+# ---- Discord API retry helper ----
 
-    _, after_colon = resp.split(":", 1)
-    names = [n.strip() for n in after_colon.split(",") if n.strip()]
-    return names
+# Per-endpoint rate-limit gate: when an endpoint 429s we remember when
+# its bucket resets, and later calls to the same endpoint sleep until
+# then instead of firing and eating another 429. (discord.py keeps its
+# own bucket state but doesn't surface it publicly, so we learn reset
+# times from the 429s it raises.)
+_bucket_reset_at: dict[str, float] = {}
+
+
+async def _wait_for_bucket(bucket: str):
+    delay = _bucket_reset_at.get(bucket, 0.0) - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+def _retry_after(e) -> float | None:
+    """Extract how long Discord asked us to wait, if it told us.
+
+    discord.RateLimited carries retry_after directly; a 429 surfacing as
+    plain HTTPException only has it in the Retry-After response header.
+    """
+    retry_after = getattr(e, "retry_after", None)
+    if retry_after is not None:
+        return retry_after
+    response = getattr(e, "response", None)
+    if response is not None:
+        try:
+            return float(response.headers.get("Retry-After", ""))
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+async def _with_retry(coro_factory, max_retries=3, base=1.0, cap=30.0, bucket=None):
+    """Await a Discord API call, retrying transient failures.
+
+    `coro_factory` is a zero-arg callable returning a fresh coroutine
+    (a coroutine object can only be awaited once). Rate limits (429) and
+    Discord server errors are retried with exponential backoff + jitter;
+    when Discord tells us how long to wait, we use that instead. Other
+    HTTP errors (permissions, bad request, ...) are raised immediately.
+    When `bucket` is given, each attempt first waits out any known reset
+    time for that endpoint, and 429s update it.
+    """
+    for attempt in range(max_retries + 1):
+        if bucket is not None:
+            await _wait_for_bucket(bucket)
+        try:
+            return await coro_factory()
+        except (discord.RateLimited, discord.HTTPException) as e:
+            rate_limited = (
+                isinstance(e, discord.RateLimited)
+                or getattr(e, "status", None) == 429
+            )
+            if not rate_limited and not isinstance(e, discord.DiscordServerError):
+                raise
+            retry_after = _retry_after(e)
+            if rate_limited and retry_after and bucket is not None:
+                _bucket_reset_at[bucket] = time.monotonic() + retry_after
+            if attempt == max_retries:
+                raise
+            delay = min(cap, base * 2 ** attempt) * (1 + random.uniform(0, 0.5))
+            if rate_limited and retry_after:
+                delay = retry_after
+            await asyncio.sleep(delay)
 
 
 # ---- Events ----
 
 @bot.event
 async def on_ready():
-    print(f"✅ Logged in as {bot.user} (ID: {bot.user.id})")
+    global _last_presence
+
+    logger.info("✅ Logged in as %s (ID: %s)", bot.user, bot.user.id)
+
+    # on_ready also fires after a session re-IDENTIFY, which wipes our
+    # presence server-side; forget the last pushed state so the next
+    # tick re-sends it even if the player count hasn't changed.
+    _last_presence = None
 
     if STATUS_CHANNEL_ID:
-        channel = bot.get_channel(STATUS_CHANNEL_ID)
+        channel = _get_status_channel()
         if channel:
             await send_cartofia_ad(channel)
         else:
-            print(f"Could not find channel with ID {STATUS_CHANNEL_ID}")
+            logger.warning("Could not find channel with ID %s", STATUS_CHANNEL_ID)
 
     if not update_presence.is_running():
         update_presence.start()
@@ -140,9 +400,34 @@ async def on_ready():
 
 # ---- Background task: presence + channel topic + announcements ----
 
+async def _update_topic(channel: discord.TextChannel, topic: str):
+    """Edit the channel topic, at most once per TOPIC_EDIT_MIN_INTERVAL.
+
+    Changes arriving inside the interval are dropped; every tick calls
+    this again with the freshly computed topic, so the latest value is
+    written as soon as the interval allows another edit.
+    """
+    global _last_topic_edit_ts
+
+    if channel.topic == topic:
+        return
+
+    if time.monotonic() - _last_topic_edit_ts < TOPIC_EDIT_MIN_INTERVAL:
+        return
+
+    try:
+        await _with_retry(
+            lambda: channel.edit(topic=topic, reason="Update Minecraft status"),
+            bucket="topic-edit",
+        )
+        _last_topic_edit_ts = time.monotonic()
+    except Exception:
+        logger.warning("Failed to update channel topic", exc_info=True)
+
+
 @tasks.loop(seconds=60)
 async def update_presence():
-    global last_server_online
+    global last_server_online, _last_presence
 
     # Default values
     server_online = False
@@ -156,43 +441,39 @@ async def update_presence():
         max_players = status.players.max
         server_online = True
     except Exception as e:
-        print(f"Presence update: server unreachable: {e}")
-
-    # Update bot presence (the little status bubble + text)
-    if server_online:
-        activity = discord.Activity(
-            type=discord.ActivityType.watching,
-            name=f"{online} player(s) on {SERVER_NAME}",
-        )
-        await bot.change_presence(
-            status=discord.Status.online,   # green bubble
-            activity=activity,
-        )
-    else:
-        activity = discord.Activity(
-            type=discord.ActivityType.watching,
-            name=f"{SERVER_NAME} server offline",
-        )
-        # dnd gives a red-ish bubble
-        await bot.change_presence(
-            status=discord.Status.dnd,
-            activity=activity,
-        )
+        logger.warning("Presence update: server unreachable: %s", e)
+
+    # Update bot presence (the little status bubble + text), but only
+    # when something actually changed: each update is a gateway op that
+    # counts against the presence rate limit.
+    presence = (server_online, online)
+    if presence != _last_presence:
+        if server_online:
+            activity = discord.Activity(
+                type=discord.ActivityType.watching,
+                name=f"{online} player(s) on {SERVER_NAME}",
+            )
+            await _with_retry(lambda: bot.change_presence(
+                status=discord.Status.online,   # green bubble
+                activity=activity,
+            ), bucket="presence")
+        else:
+            # dnd gives a red-ish bubble
+            await _with_retry(lambda: bot.change_presence(
+                status=discord.Status.dnd,
+                activity=_OFFLINE_ACTIVITY,
+            ), bucket="presence")
+        _last_presence = presence
 
     # Update channel topic with players: x/y (or offline)
-    if STATUS_CHANNEL_ID is not None:
-        channel = bot.get_channel(STATUS_CHANNEL_ID)
-        if isinstance(channel, discord.TextChannel):
-            if server_online:
-                topic = f"Players: {online}/{max_players} | {SERVER_NAME}"
-            else:
-                topic = f"{SERVER_NAME} server offline"
+    channel = _get_status_channel()
+    if channel is not None:
+        if server_online:
+            topic = f"Players: {online}/{max_players} | {SERVER_NAME}"
+        else:
+            topic = f"{SERVER_NAME} server offline"
 
-            try:
-                if channel.topic != topic:  # avoid useless edits
-                    await channel.edit(topic=topic, reason="Update Minecraft status")
-            except Exception as e:
-                print(f"Failed to update channel topic: {e}")
+        await _update_topic(channel, topic)
 
     # Announce state changes (online <-> offline) in the same channel
     if STATUS_CHANNEL_ID is not None:
@@ -201,19 +482,36 @@ async def update_presence():
             last_server_online = server_online
         elif last_server_online != server_online:
             last_server_online = server_online
-            channel = bot.get_channel(STATUS_CHANNEL_ID)
-            if isinstance(channel, discord.TextChannel):
+            if channel is not None:
                 try:
                     if server_online:
-                        await channel.send("🟢 **Cartofia server is now online!**")
-                        await send_cartofia_ad(channel)
+                        # One message (announcement + ad embed) instead of
+                        # two: one HTTP POST, one rate-limit token.
+                        await _with_retry(lambda: channel.send(
+                            "🟢 **Cartofia server is now online!**",
+                            embed=build_cartofia_embed(),
+                        ), bucket="channel-send")
                     else:
-                        await channel.send("🔴 **Cartofia server is now offline!**")
-                except Exception as e:
-                    print(f"Failed to send status change message: {e}")
+                        await _with_retry(
+                            lambda: channel.send("🔴 **Cartofia server is now offline!**"),
+                            bucket="channel-send",
+                        )
+                except Exception:
+                    logger.warning("Failed to send status change message", exc_info=True)
     else:
         last_server_online = server_online
 
+    # Re-jitter the period (55-65s) so ticks never stay aligned with the
+    # wall clock or with other instances polling the same server.
+    update_presence.change_interval(seconds=60 + random.uniform(-5, 5))
+
+
+@update_presence.before_loop
+async def _before_update_presence():
+    # Random first-run offset: avoids a thundering herd against the MC
+    # server and gateway if several bots start at the same moment.
+    await asyncio.sleep(random.uniform(0, 10))
+
 
 # ---- Commands ----
 
@@ -222,14 +520,29 @@ async def online_command(ctx: commands.Context):
     """Show how many players are online (with exact names via RCON if available)."""
     msg = await ctx.send("⏳ Checking Minecraft server status...")
 
-    # Try to ping the Minecraft server
-    try:
-        status = await get_status_async()
-    except Exception as e:
+    # With a fresh cached status we can tell up front whether RCON would
+    # add anything and skip it; on a cache miss, fire both concurrently
+    # so the user waits max(ping, rcon) instead of ping + rcon.
+    cached = (
+        _status_cache["value"]
+        if time.monotonic() < _status_cache["expires"]
+        else None
+    )
+    if cached is not None:
+        status = cached
+        rcon_resp = await rcon_list_async() if _rcon_needed(status) else None
+    else:
+        status, rcon_resp = await asyncio.gather(
+            get_status_async(),
+            rcon_list_async(),
+            return_exceptions=True,
+        )
+
+    if isinstance(status, BaseException):
         await msg.edit(
             content=(
                 f"🔴 Could not reach the server at `{MC_HOST}:{MC_PORT}`.\n"
-                f"```{e}```"
+                f"```{status}```"
             )
         )
         return
@@ -239,10 +552,8 @@ async def online_command(ctx: commands.Context):
 
     # First try RCON for exact names
     player_names: list[str] = []
-    if online > 0 and RCON_ENABLED:
-        rcon_resp = await rcon_list_async()
-        if rcon_resp:
-            player_names = parse_rcon_list(rcon_resp)
+    if online > 0 and isinstance(rcon_resp, str):
+        player_names = parse_rcon_list(rcon_resp)
 
     # Fallback to mcstatus sample if RCON gives nothing
     if online > 0 and not player_names:
@@ -290,5 +601,33 @@ async def ip_command(ctx: commands.Context):
 
 # ---- Main ----
 
+async def main():
+    """Run the bot with clean shutdown on SIGINT/SIGTERM.
+
+    Explicit startup (instead of bot.run) so we can stop the presence
+    loop and close the persistent RCON session before the process exits;
+    otherwise the MC server is left with a stale RCON session.
+    """
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.create_task(bot.close()))
+        except NotImplementedError:
+            pass  # not available on this platform (e.g. Windows)
+
+    try:
+        async with bot:
+            await bot.start(DISCORD_TOKEN)
+    finally:
+        update_presence.cancel()
+        await _rcon_close()
+
+
 if __name__ == "__main__":
-    bot.run(DISCORD_TOKEN)
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    discord.utils.setup_logging()  # bot.run() used to do this for us
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass